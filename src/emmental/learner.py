@@ -51,13 +51,12 @@ class EmmentalLearner(object):
         if Meta.config["learner_config"]["local_rank"] in [-1, 0]:
             if self.use_step_base_counter:
                 self.logging_manager = LoggingManager(
-                    self.n_batches_per_epoch, 0, self.start_step
+                    self.n_batches_per_epoch, batch_count=self.start_step
                 )
             else:
                 self.logging_manager = LoggingManager(
                     self.n_batches_per_epoch,
-                    self.start_epoch,
-                    self.start_epoch * self.n_batches_per_epoch,
+                    batch_count=self.start_epoch * self.n_batches_per_epoch,
                 )
 
     def _set_optimizer(self, model: EmmentalModel) -> None:
@@ -383,13 +382,16 @@ class EmmentalLearner(object):
         model: EmmentalModel,
         dataloaders: List[EmmentalDataLoader],
         batch_size: int,
+        epoch_end: bool = False,
     ) -> Dict[str, float]:
         """Check if it's time to evaluting or checkpointing.
 
         Args:
           model: The model to log.
           dataloaders: The data to evaluate.
-          batch_size: Batch size.
+          batch_size: Batch size, or the number of samples in the epoch if epoch_end.
+          epoch_end: Whether to update the counters with a whole epoch, defaults to
+            False.
 
         Returns:
           The score dict.
@@ -399,7 +401,10 @@ class EmmentalLearner(object):
 
         metric_dict = dict()
 
-        self.logging_manager.update(batch_size)
+        if epoch_end:
+            self.logging_manager.update_epoch_end(batch_size)
+        else:
+            self.logging_manager.update(batch_size)
 
         trigger_evaluation = self.logging_manager.trigger_evaluation()
 
@@ -641,6 +646,18 @@ class EmmentalLearner(object):
         # Set gradients of all model parameters to zero
         self.optimizer.zero_grad()
 
+        # Only check evaluation and checkpointing at the end of each epoch when they
+        # cannot happen within an epoch, the running losses are aggregated over the
+        # epoch. The plateau lr scheduler reads the per batch metrics so it is
+        # excluded.
+        log_per_epoch = (
+            Meta.config["learner_config"]["local_rank"] in [-1, 0]
+            and not self.use_step_base_counter
+            and not self.logging_manager.per_batch_hooks_needed
+            and Meta.config["learner_config"]["lr_scheduler_config"]["lr_scheduler"]
+            != "plateau"
+        )
+
         batch_iterator = self.task_scheduler.get_batches(train_dataloaders, model)
         for epoch_num in range(self.start_epoch, self.end_epoch):
             step_pbar = tqdm(
@@ -651,6 +668,7 @@ class EmmentalLearner(object):
                 disable=not Meta.config["meta_config"]["verbose"]
                 or Meta.config["learner_config"]["local_rank"] not in [-1, 0],
             )
+            epoch_size = 0
             for step_num in step_pbar:
                 if self.use_step_base_counter:
                     step_pbar.set_description(f"Step {step_num+1}/{self.total_steps}")
@@ -741,13 +759,22 @@ class EmmentalLearner(object):
                     # Set gradients of all model parameters to zero
                     self.optimizer.zero_grad()
 
-                if Meta.config["learner_config"]["local_rank"] in [-1, 0]:
+                if log_per_epoch:
+                    epoch_size += batch_size
+                elif Meta.config["learner_config"]["local_rank"] in [-1, 0]:
                     self.metrics.update(self._logging(model, dataloaders, batch_size))
 
                     step_pbar.set_postfix(self.metrics)
 
                 # Update lr using lr scheduler
                 self._update_lr_scheduler(model, total_step_num, self.metrics)
+
+            if log_per_epoch:
+                self.metrics.update(
+                    self._logging(model, dataloaders, epoch_size, epoch_end=True)
+                )
+
+                step_pbar.set_postfix(self.metrics)
             step_pbar.close()
 
         if Meta.config["learner_config"]["local_rank"] in [-1, 0]:
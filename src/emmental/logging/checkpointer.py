@@ -1,9 +1,10 @@
 """Emmental checkpointer."""
+import copy
 import glob
 import logging
 import os
 from shutil import copyfile
-from typing import Dict, List, Set, Union
+from typing import Any, Dict, List, Set, Union
 
 import torch
 from torch.optim.lr_scheduler import _LRScheduler
@@ -15,6 +16,42 @@ from emmental.model import EmmentalModel
 logger = logging.getLogger(__name__)
 
 
+def _clone_to_cpu(obj: Any) -> Any:
+    """Clone all the Tensors in a (possibly) nested structure to the CPU.
+
+    Args:
+      obj: The object to clone.
+
+    Returns:
+      The cloned object.
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    elif isinstance(obj, dict):
+        # Shallow copy first to keep the dict type and attributes (e.g. the
+        # _metadata of module state dicts)
+        cloned = copy.copy(obj)
+        for key, value in obj.items():
+            cloned[key] = _clone_to_cpu(value)
+        return cloned
+    elif isinstance(obj, list):
+        return [_clone_to_cpu(item) for item in obj]
+    else:
+        return obj
+
+
+def _count_states(module_pool: Dict[str, Any]) -> int:
+    """Count the states in a module pool state.
+
+    Args:
+      module_pool: The module pool state.
+
+    Returns:
+      The number of states.
+    """
+    return sum(len(module_state) for module_state in module_pool.values())
+
+
 class Checkpointer(object):
     """Checkpointing class to log train information."""
 
@@ -90,6 +127,23 @@ class Checkpointer(object):
 
         self.checkpoint_paths: List[str] = []
 
+        # Set up incremental checkpointing, where each model checkpoint only holds
+        # the states changed since the previous one and the file names of the
+        # previous model checkpoints it is based on, back to the last full one
+        self.checkpoint_incremental = Meta.config["logging_config"][
+            "checkpointer_config"
+        ]["checkpoint_incremental"]
+        self.checkpoint_incremental_base_freq = Meta.config["logging_config"][
+            "checkpointer_config"
+        ]["checkpoint_incremental_base_freq"]
+        if self.checkpoint_incremental and self.checkpoint_incremental_base_freq <= 0:
+            raise ValueError(
+                f"Invalid checkpoint incremental base freq "
+                f"{self.checkpoint_incremental_base_freq}, must be greater 0."
+            )
+        self.model_chain_paths: List[str] = []
+        self._last_module_pool: Dict[str, Any] = dict()
+
         # Set up checkpoint clear
         self.clear_intermediate_checkpoints = Meta.config["logging_config"][
             "checkpointer_config"
@@ -120,16 +174,103 @@ class Checkpointer(object):
           lr_scheduler: Learning rate scheduler.
           metric_dict: The metric dict.
         """
-        # Check the checkpoint_runway condition is met
-        if iteration < self.checkpoint_runway:
+        if not self.should_checkpoint(iteration):
             return
-        elif not self.checkpoint_condition_met and iteration >= self.checkpoint_runway:
+
+        self.save(iteration, self.snapshot(model, optimizer, lr_scheduler), metric_dict)
+
+    def should_checkpoint(self, iteration: Union[float, int]) -> bool:
+        """Check if the checkpoint_runway condition is met.
+
+        Args:
+          iteration: The current iteration.
+
+        Returns:
+          Whether to checkpoint at the current iteration.
+        """
+        if iteration < self.checkpoint_runway:
+            return False
+        elif not self.checkpoint_condition_met:
             self.checkpoint_condition_met = True
             logger.info("checkpoint_runway condition has been met. Start checkpoining.")
+        return True
+
+    def snapshot(
+        self, model: EmmentalModel, optimizer: Optimizer, lr_scheduler: _LRScheduler
+    ) -> Dict[str, Any]:
+        """Copy the model, optimizer and lr_scheduler states to the CPU.
+
+        The snapshot is independent of the training process, so it can be saved
+        while training continues.
 
+        Args:
+          model: The model to checkpoint.
+          optimizer: The optimizer used during training process.
+          lr_scheduler: Learning rate scheduler.
+
+        Returns:
+          The state snapshot.
+        """
+        model_state = {"name": model.name, "module_pool": model.collect_state_dict()}
+        optimizer_state = optimizer.state_dict()
+        scheduler_state = lr_scheduler.state_dict() if lr_scheduler else None
+
+        return _clone_to_cpu(
+            {
+                "model": model_state,
+                "optimizer": optimizer_state,
+                "lr_scheduler": scheduler_state,
+            }
+        )
+
+    def save(
+        self,
+        iteration: Union[float, int],
+        state: Dict[str, Any],
+        metric_dict: Dict[str, float],
+    ) -> None:
+        """Save the state snapshot to the checkpoint files.
+
+        Args:
+          iteration: The current iteration.
+          state: The state snapshot.
+          metric_dict: The metric dict.
+        """
         # Save model state
         model_path = f"{self.checkpoint_path}/checkpoint_{iteration}.model.pth"
-        model.save(model_path, verbose=False)
+        if self.checkpoint_incremental:
+            module_pool = state["model"]["module_pool"]
+            diff_module_pool = self._diff_module_pool(module_pool)
+            # Start a new chain with a full model checkpoint every
+            # checkpoint_incremental_base_freq checkpoints, or when all the states
+            # changed anyway (e.g., in full fine-tuning)
+            if (
+                len(self.model_chain_paths) >= self.checkpoint_incremental_base_freq
+                or _count_states(diff_module_pool) == _count_states(module_pool)
+            ):
+                self.model_chain_paths = []
+                diff_module_pool = module_pool
+            torch.save(
+                {
+                    "model": {
+                        "name": state["model"]["name"],
+                        "module_pool": diff_module_pool,
+                    },
+                    "iteration": None,
+                    "metric_dict": None,
+                    "base_model_paths": [
+                        os.path.basename(path) for path in self.model_chain_paths
+                    ],
+                },
+                model_path,
+            )
+            self.model_chain_paths.append(model_path)
+            self._last_module_pool = module_pool
+        else:
+            torch.save(
+                {"model": state["model"], "iteration": None, "metric_dict": None},
+                model_path,
+            )
         logger.info(
             f"Save checkpoint of {iteration} {self.checkpoint_unit} "
             f"at {model_path}."
@@ -138,19 +279,20 @@ class Checkpointer(object):
         # Save optimizer state
         optimizer_path = f"{self.checkpoint_path}/checkpoint_{iteration}.optimizer.pth"
         optimizer_dict = {
-            "optimizer": optimizer.state_dict(),
+            "optimizer": state["optimizer"],
         }
         torch.save(optimizer_dict, optimizer_path)
 
         # Save lr_scheduler state
         scheduler_path = f"{self.checkpoint_path}/checkpoint_{iteration}.scheduler.pth"
-        scheduler_dict = {
-            "lr_scheduler": lr_scheduler.state_dict() if lr_scheduler else None
-        }
+        scheduler_dict = {"lr_scheduler": state["lr_scheduler"]}
         torch.save(scheduler_dict, scheduler_path)
 
         if self.checkpoint_all is False:
             for path in self.checkpoint_paths:
+                # Keep the model checkpoints the latest incremental one is based on
+                if path in self.model_chain_paths:
+                    continue
                 if os.path.exists(path):
                     os.remove(path)
 
@@ -165,10 +307,21 @@ class Checkpointer(object):
                     f"{self.checkpoint_path}/best_model_"
                     f"{metric.replace('/', '_')}.model.pth"
                 )
-                copyfile(
-                    model_path,
-                    best_metric_model_path,
-                )
+                if self.checkpoint_incremental:
+                    # Save the full best model, which is independent of the chain
+                    torch.save(
+                        {
+                            "model": state["model"],
+                            "iteration": None,
+                            "metric_dict": None,
+                        },
+                        best_metric_model_path,
+                    )
+                else:
+                    copyfile(
+                        model_path,
+                        best_metric_model_path,
+                    )
                 logger.info(
                     f"Save best model of metric {metric} to {best_metric_model_path}"
                 )
@@ -185,6 +338,34 @@ class Checkpointer(object):
                 )
                 copyfile(scheduler_path, best_metric_scheduler_path)
 
+    def _diff_module_pool(self, module_pool: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect the module states changed since the previous checkpoint.
+
+        Args:
+          module_pool: The current module pool state.
+
+        Returns:
+          The changed module pool state.
+        """
+        diff_module_pool = dict()
+        for module_name, module_state in module_pool.items():
+            last_module_state = self._last_module_pool.get(module_name, {})
+            # Shallow copy first to keep the state dict type and attributes
+            diff_module_state = copy.copy(module_state)
+            for key, value in module_state.items():
+                last_value = last_module_state.get(key)
+                if (
+                    isinstance(value, torch.Tensor)
+                    and isinstance(last_value, torch.Tensor)
+                    and value.dtype == last_value.dtype
+                    and torch.equal(value, last_value)
+                ):
+                    del diff_module_state[key]
+            if diff_module_state:
+                diff_module_pool[module_name] = diff_module_state
+
+        return diff_module_pool
+
     def is_new_best(self, metric_dict: Dict[str, float]) -> Set[str]:
         """Update the best score.
 
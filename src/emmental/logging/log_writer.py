@@ -56,6 +56,10 @@ class LogWriter(object):
         with open(log_path, "w") as f:
             json.dump(self.run_log, f)
 
+    def flush(self) -> None:
+        """Flush the log writer."""
+        pass
+
     def close(self) -> None:
         """Close the log writer."""
         pass
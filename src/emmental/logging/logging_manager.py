@@ -1,6 +1,12 @@
 """Emmental logging manager."""
+import atexit
 import logging
-from typing import Dict, Union
+import math
+import time
+import warnings
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 from torch.optim.lr_scheduler import _LRScheduler
 from torch.optim.optimizer import Optimizer
@@ -13,53 +19,153 @@ from emmental.model import EmmentalModel
 
 logger = logging.getLogger(__name__)
 
+# Supported evaluation/checkpointing units and their kinds
+_COUNTER_UNITS = {"sample": 0, "batch": 1, "epoch": 2}
+
+# Weight of the latest checkpointing time in its moving average
+_CHECKPOINT_TIME_SMOOTHING = 0.5
+
+# Writers shared by the logging managers which log to the same directory, and the
+# number of open logging managers using each of them
+_WRITER_CACHE: Dict[str, LogWriter] = {}
+_WRITER_REFS: Dict[str, int] = {}
+
+# Logging managers whose writer is not released yet
+_OPEN_LOGGING_MANAGERS: "weakref.WeakSet[LoggingManager]" = weakref.WeakSet()
+
+
+def _release_writer(writer_key: str) -> None:
+    """Release a shared writer and close it once no logging manager uses it.
+
+    Args:
+      writer_key: The key of the writer in the writer cache.
+    """
+    if writer_key not in _WRITER_REFS:
+        return
+    _WRITER_REFS[writer_key] -= 1
+    if _WRITER_REFS[writer_key] == 0:
+        _WRITER_CACHE.pop(writer_key).close()
+        del _WRITER_REFS[writer_key]
+
+
+def _close_shared_writers() -> None:
+    """Drain the open logging managers and close their writers at exit."""
+    for logging_manager in list(_OPEN_LOGGING_MANAGERS):
+        logging_manager.close_writer()
+    for writer in _WRITER_CACHE.values():
+        writer.close()
+    _WRITER_CACHE.clear()
+    _WRITER_REFS.clear()
+
+
+atexit.register(_close_shared_writers)
+
 
 class LoggingManager(object):
     """A class to manage logging during training progress.
 
     Args:
       n_batches_per_epoch: Total number batches per epoch.
+      epoch_count: Deprecated and ignored, the epoch counters are derived from
+        batch_count, defaults to 0.
+      batch_count: Number of batches passed, defaults to 0.
     """
 
     def __init__(
         self, n_batches_per_epoch: int, epoch_count: int = 0, batch_count: int = 0
     ) -> None:
         """Initialize LoggingManager."""
+        if epoch_count:
+            warnings.warn(
+                "The epoch_count argument of LoggingManager is deprecated and "
+                "ignored, the epoch counters are derived from batch_count.",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+
         self.n_batches_per_epoch = n_batches_per_epoch
 
+        logging_config = Meta.config["logging_config"]
+        verbose = Meta.config["meta_config"]["verbose"]
+
         # Set up counter
 
         # Set up evaluation/checkpointing unit (sample, batch, epoch)
-        self.counter_unit = Meta.config["logging_config"]["counter_unit"]
+        self.counter_unit = logging_config["counter_unit"]
 
-        if self.counter_unit not in ["sample", "batch", "epoch"]:
+        # Resolve the counter unit once so that the counters dispatch on an integer
+        self._unit_kind = _COUNTER_UNITS.get(self.counter_unit)
+        if self._unit_kind is None:
             raise ValueError(f"Unrecognized unit: {self.counter_unit}")
 
         # Set up evaluation frequency
-        self.evaluation_freq = Meta.config["logging_config"]["evaluation_freq"]
-        if Meta.config["meta_config"]["verbose"]:
-            logger.info(f"Evaluating every {self.evaluation_freq} {self.counter_unit}.")
+        self.evaluation_freq = logging_config["evaluation_freq"]
+
+        # Set up the number of batches that triggers the evaluation, so that
+        # batch and epoch units only need an integer comparison per batch
+        if self._unit_kind == 1:
+            self._trigger_batches = math.ceil(self.evaluation_freq)
+        elif self._unit_kind == 2:
+            self._trigger_batches = math.ceil(
+                self.evaluation_freq * self.n_batches_per_epoch
+            )
+            # Guard against the rounding error of the float product above
+            while (
+                self._trigger_batches > 0
+                and (self._trigger_batches - 1) / self.n_batches_per_epoch
+                >= self.evaluation_freq
+            ):
+                self._trigger_batches -= 1
+            while (
+                self._trigger_batches / self.n_batches_per_epoch < self.evaluation_freq
+            ):
+                self._trigger_batches += 1
+
+        # Evaluation (and thus checkpointing) only happens at epoch ends when
+        # evaluating every k epochs, in which case the counters can be updated once
+        # per epoch with update_epoch_end() instead of update() on every batch
+        self.per_batch_hooks_needed = not (
+            self._unit_kind == 2 and self.evaluation_freq == int(self.evaluation_freq)
+        )
 
-        if Meta.config["logging_config"]["checkpointing"]:
-            self.checkpointing = True
+        self.checkpointing = logging_config["checkpointing"]
+        if self.checkpointing:
+            checkpointer_config = logging_config["checkpointer_config"]
 
             # Set up checkpointing frequency
-            self.checkpointing_freq = int(
-                Meta.config["logging_config"]["checkpointer_config"]["checkpoint_freq"]
-            )
-            if Meta.config["meta_config"]["verbose"]:
+            self.checkpointing_freq = int(checkpointer_config["checkpoint_freq"])
+
+            # Set up the minimum wall time between checkpoints, in units of the
+            # moving average of the checkpointing time and capped by max interval
+            self.checkpoint_interval_factor = checkpointer_config[
+                "checkpoint_interval_factor"
+            ]
+            self.checkpoint_max_interval = checkpointer_config[
+                "checkpoint_max_interval"
+            ]
+            self._checkpoint_time: Optional[float] = None
+            self._last_checkpoint_ts = time.monotonic()
+
+        if verbose:
+            logger.info(f"Evaluating every {self.evaluation_freq} {self.counter_unit}.")
+            if self.checkpointing:
                 logger.info(
                     f"Checkpointing every "
                     f"{self.checkpointing_freq * self.evaluation_freq} "
                     f"{self.counter_unit}."
                 )
+            else:
+                logger.info("No checkpointing.")
 
+        if self.checkpointing:
             # Set up checkpointer
             self.checkpointer = Checkpointer()
-        else:
-            self.checkpointing = False
-            if Meta.config["meta_config"]["verbose"]:
-                logger.info("No checkpointing.")
+
+            # Save checkpoints in a single background thread, so that disk I/O
+            # overlaps with training and two checkpoints never overlap
+            self._checkpoint_executor = ThreadPoolExecutor(max_workers=1)
+
+        self._checkpoint_future: Optional[Future] = None
 
         # Set up number of samples passed since last evaluation/checkpointing and
         # total number of samples passed since learning process
@@ -70,50 +176,76 @@ class LoggingManager(object):
         # total number of batches passed since learning process
         self.batch_count: int = batch_count
         self.batch_total: int = batch_count
-        if self.batch_count != 0:
-            if self.counter_unit == "batch":
-                while self.batch_count >= self.evaluation_freq:
-                    self.batch_count -= self.evaluation_freq
-            elif self.counter_unit == "epoch":
-                while (
-                    self.batch_count >= self.evaluation_freq * self.n_batches_per_epoch
-                ):
-                    self.batch_count -= self.evaluation_freq * self.n_batches_per_epoch
-
-        # Set up number of epochs passed since last evaluation/checkpointing and
-        # total number of epochs passed since learning process
-        self.epoch_count: Union[float, int] = epoch_count
-        self.epoch_total: Union[float, int] = epoch_count
-        if self.epoch_count != 0:
-            if self.counter_unit == "epoch":
-                while self.epoch_count >= self.evaluation_freq:
-                    self.epoch_count -= self.evaluation_freq
-            elif self.counter_unit == "batch":
-                while (
-                    self.epoch_count >= self.evaluation_freq / self.n_batches_per_epoch
-                ):
-                    self.epoch_count -= self.evaluation_freq / self.n_batches_per_epoch
-
-        # Set up number of unit passed since last evaluation/checkpointing and
-        # total number of unit passed since learning process
-        self.unit_count: Union[float, int] = 0
-        self.unit_total: Union[float, int] = 0
+        if self.batch_count != 0 and self._unit_kind != 0:
+            # Evaluations happen every _trigger_batches batches
+            self.batch_count %= self._trigger_batches
+
+        # Set up the counters which unit_count and unit_total alias
+        self._unit_count_name, self._unit_total_name = (
+            ("sample_count", "sample_total"),
+            ("batch_count", "batch_total"),
+            ("epoch_count", "epoch_total"),
+        )[self._unit_kind]
 
         # Set up count that triggers the evaluation since last checkpointing
         self.trigger_count = 0
 
+        # Whether the evaluation is triggered since the last checkpointing check
+        self._evaluation_triggered = False
+
         # Set up log writer
-        writer_opt = Meta.config["logging_config"]["writer_config"]["writer"]
+        writer_opt = logging_config["writer_config"]["writer"]
 
+        self._writer_finalizer: Optional[weakref.finalize] = None
         if writer_opt is None:
             self.writer = None
-        elif writer_opt == "json":
-            self.writer = LogWriter()
-        elif writer_opt == "tensorboard":
-            self.writer = TensorBoardWriter()
+        elif writer_opt in ["json", "tensorboard"]:
+            # Share the writer with other logging managers using the same log path,
+            # the last manager releasing it closes it
+            self._writer_key = f"{writer_opt}:{Meta.log_path}"
+            if self._writer_key not in _WRITER_CACHE:
+                _WRITER_CACHE[self._writer_key] = (
+                    LogWriter() if writer_opt == "json" else TensorBoardWriter()
+                )
+                _WRITER_REFS[self._writer_key] = 0
+            _WRITER_REFS[self._writer_key] += 1
+            _OPEN_LOGGING_MANAGERS.add(self)
+            self.writer = _WRITER_CACHE[self._writer_key]
+
+            # Release the writer if the manager is collected without being closed
+            # (e.g., the learning process failed), at exit the open managers are
+            # closed by _close_shared_writers instead
+            self._writer_finalizer = weakref.finalize(
+                self, _release_writer, self._writer_key
+            )
+            self._writer_finalizer.atexit = False
         else:
             raise ValueError(f"Unrecognized writer option '{writer_opt}'")
 
+        # Bind the writer's add_scalar once for the write loop
+        self._add_scalar = self.writer.add_scalar if self.writer is not None else None
+
+        # Set up log buffer which is written to the writer every flush_every scalars,
+        # the writer itself is only flushed at checkpointing and closing
+        self.flush_every = logging_config["writer_config"]["flush_every"]
+        self._log_buffer: List[Tuple[str, float, int]] = []
+
+        # Set up log period in counter unit, metrics written within a period are
+        # averaged and each metric is logged at most once per step
+        self.log_period = logging_config["writer_config"]["log_period"]
+        self._pending_metrics: Dict[str, List[float]] = {}
+        self._current_step: Optional[int] = None
+        self._last_logged_step: Optional[int] = None
+        self._step_metric_names: Set[str] = set()
+
+        # As Tensorboard only allows integer values, we log epochs in batches
+        self._log_step_name = "sample_total" if self._unit_kind == 0 else "batch_total"
+        self._log_period_steps = (
+            self.log_period * self.n_batches_per_epoch
+            if self._unit_kind == 2
+            else self.log_period
+        )
+
     def update(self, batch_size: int) -> None:
         """Update the counter.
 
@@ -128,26 +260,52 @@ class LoggingManager(object):
         self.batch_count += 1
         self.batch_total += 1
 
-        # Update number of epochs
-        self.epoch_count = self.batch_count / self.n_batches_per_epoch
-        self.epoch_total = self.batch_total / self.n_batches_per_epoch
-
-        # Update number of units
-        if self.counter_unit == "sample":
-            self.unit_count = self.sample_count
-            self.unit_total = self.sample_total
-        if self.counter_unit == "batch":
-            self.unit_count = self.batch_count
-            self.unit_total = self.batch_total
-        elif self.counter_unit == "epoch":
-            self.unit_count = self.epoch_count
-            self.unit_total = self.epoch_total
+    def update_epoch_end(self, n_samples: int) -> None:
+        """Update the counter with a whole epoch.
+
+        Equivalent to calling update() on every batch of the epoch, which is only
+        needed when per_batch_hooks_needed is True.
+
+        Args:
+          n_samples: The number of the samples in the epoch.
+        """
+        # Update number of samples
+        self.sample_count += n_samples
+        self.sample_total += n_samples
+
+        # Update number of batches
+        self.batch_count += self.n_batches_per_epoch
+        self.batch_total += self.n_batches_per_epoch
+
+    @property
+    def epoch_count(self) -> float:
+        """Number of epochs passed since last evaluation/checkpointing."""
+        return self.batch_count / self.n_batches_per_epoch
+
+    @property
+    def epoch_total(self) -> float:
+        """Total number of epochs passed since learning process."""
+        return self.batch_total / self.n_batches_per_epoch
+
+    @property
+    def unit_count(self) -> Union[float, int]:
+        """Number of units passed since last evaluation/checkpointing."""
+        return getattr(self, self._unit_count_name)
+
+    @property
+    def unit_total(self) -> Union[float, int]:
+        """Total number of units passed since learning process."""
+        return getattr(self, self._unit_total_name)
 
     def trigger_evaluation(self) -> bool:
         """Check if triggers the evaluation."""
-        satisfied = self.unit_count >= self.evaluation_freq
+        if self._unit_kind == 0:
+            satisfied = self.sample_count >= self.evaluation_freq
+        else:
+            satisfied = self.batch_count >= self._trigger_batches
         if satisfied:
             self.trigger_count += 1
+            self._evaluation_triggered = True
             self.reset()
         return satisfied
 
@@ -156,16 +314,31 @@ class LoggingManager(object):
         if not self.checkpointing:
             return False
         satisfied = self.trigger_count >= self.checkpointing_freq
+        if satisfied and self.checkpoint_interval_factor and self._checkpoint_time:
+            # Postpone the checkpoint if the previous one was too recent compared
+            # to how long checkpointing takes, a postponed checkpoint is only retried
+            # when an evaluation is triggered so that it sees the evaluation metrics
+            min_interval = min(
+                self._checkpoint_time * self.checkpoint_interval_factor,
+                self.checkpoint_max_interval,
+            )
+            satisfied = (
+                self._evaluation_triggered
+                and time.monotonic() - self._last_checkpoint_ts >= min_interval
+            )
+        self._evaluation_triggered = False
         if satisfied:
             self.trigger_count = 0
+            self.flush_logs()
         return satisfied
 
     def reset(self) -> None:
-        """Reset the counter."""
-        self.sample_count = 0
-        self.batch_count = 0
-        self.epoch_count = 0
-        self.unit_count = 0
+        """Reset the counter.
+
+        Only the sample and batch counters are stored, the epoch and unit counters
+        are derived from them.
+        """
+        self.sample_count = self.batch_count = 0
 
     def write_log(self, metric_dict: Dict[str, float]) -> None:
         """Write the metrics to the log.
@@ -173,13 +346,82 @@ class LoggingManager(object):
         Args:
           metric_dict: The metric dict.
         """
-        # As Tensorboard only allows integer values,
-        # we cast epochs back to batches for logging
-        log_unit = self.unit_total
-        if self.counter_unit == "epoch":
-            log_unit *= self.n_batches_per_epoch
+        if self.writer is None:
+            return
+
+        log_unit = getattr(self, self._log_step_name)
+        if log_unit != self._current_step:
+            self._current_step = log_unit
+            self._step_metric_names = set()
+
+        # Accumulate the metrics which are not written at this step yet
+        pending_metrics = self._pending_metrics
+        step_metric_names = self._step_metric_names
         for metric_name, metric_value in metric_dict.items():
-            self.writer.add_scalar(metric_name, metric_value, log_unit)
+            if metric_name in step_metric_names:
+                continue
+            step_metric_names.add(metric_name)
+            if metric_name in pending_metrics:
+                pending_metrics[metric_name][0] += metric_value
+                pending_metrics[metric_name][1] += 1
+            else:
+                pending_metrics[metric_name] = [metric_value, 1]
+
+        # Log the metrics every log_period counter unit, metrics which are new at an
+        # already logged step are logged at that step as well
+        if (
+            self._last_logged_step is None
+            or log_unit == self._last_logged_step
+            or log_unit - self._last_logged_step >= self._log_period_steps
+        ):
+            self._log_pending_metrics()
+
+        if len(self._log_buffer) >= self.flush_every:
+            self._write_log_buffer()
+
+    def _log_pending_metrics(self) -> None:
+        """Move the (averaged) pending metrics to the log buffer."""
+        append = self._log_buffer.append
+        for metric_name, (metric_sum, metric_cnt) in self._pending_metrics.items():
+            append(
+                (
+                    metric_name,
+                    metric_sum if metric_cnt == 1 else metric_sum / metric_cnt,
+                    self._current_step,
+                )
+            )
+        self._pending_metrics = {}
+        self._last_logged_step = self._current_step
+
+    def _write_log_buffer(self) -> None:
+        """Write the buffered metrics to the writer without flushing it."""
+        add_scalar = self._add_scalar
+        for metric_name, metric_value, log_unit in self._log_buffer:
+            add_scalar(metric_name, metric_value, log_unit)
+        self._log_buffer = []
+
+    def flush_logs(self) -> None:
+        """Write the buffered metrics to the writer and flush it."""
+        if self.writer is None:
+            return
+
+        self._write_log_buffer()
+        self.writer.flush()
+
+    def close_writer(self) -> None:
+        """Write the pending metrics and release the shared writer.
+
+        The writer is closed once no other logging manager uses it.
+        """
+        if self._writer_finalizer is None or not self._writer_finalizer.alive:
+            return
+        _OPEN_LOGGING_MANAGERS.discard(self)
+
+        if self._pending_metrics:
+            self._log_pending_metrics()
+        self.flush_logs()
+
+        self._writer_finalizer()
 
     def checkpoint_model(
         self,
@@ -196,10 +438,56 @@ class LoggingManager(object):
           lr_scheduler: Learning rate scheduler.
           metric_dict: the metric dict.
         """
-        self.checkpointer.checkpoint(
-            self.unit_total, model, optimizer, lr_scheduler, metric_dict
+        if not self.checkpointer.should_checkpoint(self.unit_total):
+            return
+
+        # Wait for the previous checkpoint to keep at most one pending snapshot
+        self.wait_for_checkpoint()
+
+        # Snapshot the states synchronously and save them in the background
+        self._last_checkpoint_ts = time.monotonic()
+        state = self.checkpointer.snapshot(model, optimizer, lr_scheduler)
+        self._checkpoint_future = self._checkpoint_executor.submit(
+            self._save_checkpoint,
+            self.unit_total,
+            state,
+            dict(metric_dict),
+            time.monotonic() - self._last_checkpoint_ts,
         )
 
+    def _save_checkpoint(
+        self,
+        iteration: Union[float, int],
+        state: Dict[str, Any],
+        metric_dict: Dict[str, float],
+        snapshot_time: float,
+    ) -> None:
+        """Save the checkpoint and update the moving average checkpointing time.
+
+        Args:
+          iteration: The current iteration.
+          state: The state snapshot.
+          metric_dict: The metric dict.
+          snapshot_time: The time spent on taking the snapshot.
+        """
+        start_ts = time.monotonic()
+        self.checkpointer.save(iteration, state, metric_dict)
+        checkpoint_time = snapshot_time + time.monotonic() - start_ts
+
+        if self._checkpoint_time is None:
+            self._checkpoint_time = checkpoint_time
+        else:
+            self._checkpoint_time += _CHECKPOINT_TIME_SMOOTHING * (
+                checkpoint_time - self._checkpoint_time
+            )
+
+    def wait_for_checkpoint(self) -> None:
+        """Wait for the pending checkpoint to be saved."""
+        if self._checkpoint_future is not None:
+            future, self._checkpoint_future = self._checkpoint_future, None
+            # Re-raise the error happened during saving if any
+            future.result()
+
     def close(self, model: EmmentalModel) -> EmmentalModel:
         """Close the checkpointer and reload the model if necessary.
 
@@ -209,8 +497,16 @@ class LoggingManager(object):
         Returns:
           The reloaded model if necessary
         """
-        self.writer.close()
+        self.close_writer()
         if self.checkpointing:
+            try:
+                self.wait_for_checkpoint()
+            except BaseException:
+                # Clear the checkpoints before re-raising the saving error
+                self.checkpointer.clear()
+                raise
+            finally:
+                self._checkpoint_executor.shutdown()
             model = self.checkpointer.load_best_model(model)
             self.checkpointer.clear()
         return model
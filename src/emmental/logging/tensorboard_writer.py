@@ -49,6 +49,10 @@ class TensorBoardWriter(LogWriter):
         """
         pass
 
+    def flush(self) -> None:
+        """Flush the tensorboard writer."""
+        self.writer.flush()
+
     def close(self) -> None:
         """Close the tensorboard writer."""
         self.writer.close()
@@ -1,11 +1,32 @@
 """Emmental accuracy f1 scorer."""
-from statistics import mean
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 from numpy import ndarray
 
-from emmental.metrics.accuracy import accuracy_scorer
-from emmental.metrics.fbeta import f1_scorer
+from emmental.utils.utils import prob_to_pred
+
+
+def _binary_confusion(
+    golds: ndarray, preds: ndarray, pos_label: int = 1
+) -> Tuple[int, int, int, int]:
+    """Count matches and the positive class confusion entries in one pass.
+
+    Args:
+      golds: Ground truth values.
+      preds: Predicted values.
+      pos_label: The positive class label, defaults to 1.
+
+    Returns:
+      Number of matches, true positives, false positives and false negatives.
+    """
+    # Encode each sample as (match, gold is positive, pred is positive) bits
+    counts = np.bincount(
+        4 * (golds == preds) + 2 * (golds == pos_label) + (preds == pos_label),
+        minlength=8,
+    ).tolist()
+
+    return sum(counts[4:]), counts[7], counts[1], counts[2]
 
 
 def accuracy_f1_scorer(
@@ -27,9 +48,17 @@ def accuracy_f1_scorer(
     Returns:
       Average of accuracy and f1.
     """
-    metrics = dict()
-    accuracy = accuracy_scorer(golds, probs, preds, uids)
-    f1 = f1_scorer(golds, probs, preds, uids, pos_label=pos_label)
-    metrics["accuracy_f1"] = mean([accuracy["accuracy"], f1["f1"]])
+    # Convert probabilistic label to hard label
+    if len(golds.shape) == 2:
+        golds = prob_to_pred(golds)
+
+    n_matches, TP, FP, FN = _binary_confusion(golds, preds, pos_label)
+
+    accuracy = n_matches / golds.shape[0]
+    precision = TP / (TP + FP) if TP + FP > 0 else 0.0
+    recall = TP / (TP + FN) if TP + FN > 0 else 0.0
+    f1 = (
+        2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+    )
 
-    return metrics
+    return {"accuracy_f1": 0.5 * (accuracy + f1)}
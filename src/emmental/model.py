@@ -774,6 +774,46 @@ class EmmentalModel(nn.Module):
         if Meta.config["meta_config"]["verbose"] and verbose:
             logger.info(f"[{self.name}] Model saved in {model_path}")
 
+    def _load_model_state(self, model_path: str) -> Dict[str, Any]:
+        """Load the full model state of a (possibly incremental) model checkpoint.
+
+        An incremental model checkpoint only holds the states changed since the
+        previous one and the file names of the model checkpoints it is based on,
+        which are resolved relative to its own directory.
+
+        Args:
+          model_path: The model checkpoint path.
+
+        Returns:
+          The model state.
+        """
+        checkpoint = torch.load(model_path, map_location=torch.device("cpu"))
+        if not checkpoint.get("base_model_paths"):
+            return checkpoint["model"]
+
+        checkpoint_dir = os.path.dirname(model_path)
+        model_states = itertools.chain(
+            (
+                torch.load(
+                    os.path.join(checkpoint_dir, base_model_path),
+                    map_location=torch.device("cpu"),
+                )["model"]
+                for base_model_path in checkpoint["base_model_paths"]
+            ),
+            [checkpoint["model"]],
+        )
+
+        # Apply the changed states in order on top of the full model checkpoint
+        module_pool: Dict[str, Any] = dict()
+        for model_state in model_states:
+            for module_name, module_state in model_state["module_pool"].items():
+                if module_name in module_pool:
+                    module_pool[module_name].update(module_state)
+                else:
+                    module_pool[module_name] = module_state
+
+        return {"name": checkpoint["model"]["name"], "module_pool": module_pool}
+
     def load(
         self,
         model_path: str,
@@ -789,12 +829,12 @@ class EmmentalModel(nn.Module):
             logger.error("Loading failed... Model does not exist.")
 
         try:
-            checkpoint = torch.load(model_path, map_location=torch.device("cpu"))
+            model_state = self._load_model_state(model_path)
         except BaseException:
             logger.error(f"Loading failed... Cannot load model from {model_path}")
             raise
 
-        self.load_state_dict(checkpoint["model"]["module_pool"])
+        self.load_state_dict(model_state["module_pool"])
 
         if Meta.config["meta_config"]["verbose"] and verbose:
             logger.info(f"[{self.name}] Model loaded from {model_path}")
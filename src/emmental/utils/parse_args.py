@@ -807,6 +807,20 @@ def parse_args(parser: Optional[ArgumentParser] = None) -> ArgumentParser:
         help="The writer format (json, tensorboard)",
     )
 
+    logging_config.add_argument(
+        "--writer_flush_every",
+        type=int,
+        default=1,
+        help="Write the buffered scalars to the writer every k scalars",
+    )
+
+    logging_config.add_argument(
+        "--writer_log_period",
+        type=float,
+        default=0,
+        help="Log averaged metrics at most every k counter_unit (0 to log all)",
+    )
+
     logging_config.add_argument(
         "--checkpointing",
         type=str2bool,
@@ -859,6 +873,37 @@ def parse_args(parser: Optional[ArgumentParser] = None) -> ArgumentParser:
         help="Whether to checkpoint all checkpoints",
     )
 
+    logging_config.add_argument(
+        "--checkpoint_incremental",
+        type=str2bool,
+        default=False,
+        help="Whether to only save model states changed since the previous checkpoint",
+    )
+
+    logging_config.add_argument(
+        "--checkpoint_incremental_base_freq",
+        type=int,
+        default=10,
+        help="Save a full model checkpoint every k incremental checkpoints",
+    )
+
+    logging_config.add_argument(
+        "--checkpoint_interval_factor",
+        type=float,
+        default=0,
+        help=(
+            "Minimum wall time between checkpoints in units of the average "
+            "checkpointing time (0 to disable)"
+        ),
+    )
+
+    logging_config.add_argument(
+        "--checkpoint_max_interval",
+        type=float,
+        default=3600,
+        help="Maximum seconds a checkpoint is postponed by checkpoint_interval_factor",
+    )
+
     logging_config.add_argument(
         "--clear_intermediate_checkpoints",
         type=str2bool,
@@ -1050,7 +1095,12 @@ def parse_args_to_config(args: Namespace) -> Dict[str, Any]:
         "logging_config": {
             "counter_unit": args.counter_unit,
             "evaluation_freq": args.evaluation_freq,
-            "writer_config": {"writer": args.writer, "verbose": True},
+            "writer_config": {
+                "writer": args.writer,
+                "verbose": True,
+                "flush_every": args.writer_flush_every,
+                "log_period": args.writer_log_period,
+            },
             "checkpointing": args.checkpointing,
             "checkpointer_config": {
                 "checkpoint_path": args.checkpoint_path,
@@ -1059,6 +1109,12 @@ def parse_args_to_config(args: Namespace) -> Dict[str, Any]:
                 "checkpoint_task_metrics": args.checkpoint_task_metrics,
                 "checkpoint_runway": args.checkpoint_runway,
                 "checkpoint_all": args.checkpoint_all,
+                "checkpoint_incremental": args.checkpoint_incremental,
+                "checkpoint_incremental_base_freq": (
+                    args.checkpoint_incremental_base_freq
+                ),
+                "checkpoint_interval_factor": args.checkpoint_interval_factor,
+                "checkpoint_max_interval": args.checkpoint_max_interval,
                 "clear_intermediate_checkpoints": args.clear_intermediate_checkpoints,
                 "clear_all_checkpoints": args.clear_all_checkpoints,
             },
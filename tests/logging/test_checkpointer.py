@@ -4,9 +4,11 @@ import os
 import shutil
 
 import pytest
+import torch
 
 import emmental
 from emmental.logging.checkpointer import Checkpointer
+from emmental.model import EmmentalModel
 
 
 def test_checkpointer_specific_path(caplog):
@@ -205,3 +207,118 @@ def test_checkpointer_metric(caplog):
 
     assert os.path.exists(checkpoint_path) is True
     shutil.rmtree(checkpoint_path)
+
+
+def test_checkpointer_incremental(caplog):
+    """Unit test of checkpointer (incremental)."""
+    caplog.set_level(logging.INFO)
+
+    checkpoint_path = "temp_test_checkpointer"
+    moved_checkpoint_path = "temp_test_checkpointer_moved"
+
+    emmental.Meta.reset()
+
+    emmental.init()
+    emmental.Meta.update_config(
+        config={
+            "logging_config": {
+                "counter_unit": "batch",
+                "evaluation_freq": 1,
+                "checkpointing": True,
+                "checkpointer_config": {
+                    "checkpoint_metric": {"model/all/train/loss": "min"},
+                    "checkpoint_freq": 1,
+                    "checkpoint_path": checkpoint_path,
+                    "checkpoint_incremental": True,
+                    "checkpoint_incremental_base_freq": 2,
+                },
+            }
+        }
+    )
+
+    model = EmmentalModel()
+    model.module_pool["linear"] = torch.nn.Linear(2, 2)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+
+    checkpointer = Checkpointer()
+    checkpointer.checkpoint(1, model, optimizer, None, {"model/all/train/loss": 0.5})
+
+    checkpoint = torch.load(f"{checkpoint_path}/checkpoint_1.model.pth")
+    assert set(checkpoint["model"]["module_pool"]["linear"].keys()) == {
+        "weight",
+        "bias",
+    }
+    assert checkpoint["base_model_paths"] == []
+
+    with torch.no_grad():
+        model.module_pool["linear"].bias.add_(1.0)
+    best_weight = model.module_pool["linear"].weight.detach().clone()
+    best_bias = model.module_pool["linear"].bias.detach().clone()
+
+    checkpointer.checkpoint(2, model, optimizer, None, {"model/all/train/loss": 0.4})
+
+    # Only the changed states are saved, based on the previous model checkpoint
+    checkpoint = torch.load(f"{checkpoint_path}/checkpoint_2.model.pth")
+    assert set(checkpoint["model"]["module_pool"]["linear"].keys()) == {"bias"}
+    assert checkpoint["base_model_paths"] == ["checkpoint_1.model.pth"]
+    assert os.path.exists(f"{checkpoint_path}/checkpoint_1.model.pth") is True
+    assert os.path.exists(f"{checkpoint_path}/checkpoint_1.optimizer.pth") is False
+
+    # The best model is saved in full right away
+    checkpoint = torch.load(
+        f"{checkpoint_path}/best_model_model_all_train_loss.model.pth"
+    )
+    assert torch.equal(checkpoint["model"]["module_pool"]["linear"]["bias"], best_bias)
+
+    # Incremental model checkpoints can be loaded, even after being moved
+    shutil.copytree(checkpoint_path, moved_checkpoint_path)
+    loaded_model = EmmentalModel()
+    loaded_model.module_pool["linear"] = torch.nn.Linear(2, 2)
+    loaded_model.load(f"{moved_checkpoint_path}/checkpoint_2.model.pth")
+
+    assert torch.equal(loaded_model.module_pool["linear"].weight, best_weight)
+    assert torch.equal(loaded_model.module_pool["linear"].bias, best_bias)
+
+    shutil.rmtree(moved_checkpoint_path)
+
+    # A full model checkpoint starts a new chain every 2 checkpoints and the
+    # previous chain is removed
+    with torch.no_grad():
+        model.module_pool["linear"].bias.add_(1.0)
+
+    checkpointer.checkpoint(3, model, optimizer, None, {"model/all/train/loss": 0.6})
+
+    checkpoint = torch.load(f"{checkpoint_path}/checkpoint_3.model.pth")
+    assert set(checkpoint["model"]["module_pool"]["linear"].keys()) == {
+        "weight",
+        "bias",
+    }
+    assert checkpoint["base_model_paths"] == []
+    assert os.path.exists(f"{checkpoint_path}/checkpoint_1.model.pth") is False
+    assert os.path.exists(f"{checkpoint_path}/checkpoint_2.model.pth") is False
+
+    # A full model checkpoint also starts a new chain when all states changed
+    with torch.no_grad():
+        model.module_pool["linear"].weight.add_(1.0)
+        model.module_pool["linear"].bias.add_(1.0)
+
+    checkpointer.checkpoint(4, model, optimizer, None, {"model/all/train/loss": 0.7})
+
+    checkpoint = torch.load(f"{checkpoint_path}/checkpoint_4.model.pth")
+    assert checkpoint["base_model_paths"] == []
+    assert os.path.exists(f"{checkpoint_path}/checkpoint_3.model.pth") is False
+
+    model = checkpointer.load_best_model(model)
+
+    assert torch.equal(model.module_pool["linear"].weight, best_weight)
+    assert torch.equal(model.module_pool["linear"].bias, best_bias)
+
+    checkpointer.clear()
+
+    assert os.path.exists(f"{checkpoint_path}/checkpoint_4.model.pth") is False
+    assert (
+        os.path.exists(f"{checkpoint_path}/best_model_model_all_train_loss.model.pth")
+        is True
+    )
+
+    shutil.rmtree(checkpoint_path)
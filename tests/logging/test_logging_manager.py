@@ -1,11 +1,15 @@
 """Emmental logging manager unit tests."""
+import gc
 import logging
+import os
+import shutil
 
 import pytest
+import torch
 
 import emmental
 from emmental.logging.log_writer import LogWriter
-from emmental.logging.logging_manager import LoggingManager
+from emmental.logging.logging_manager import LoggingManager, _close_shared_writers
 from emmental.logging.tensorboard_writer import TensorBoardWriter
 from emmental.meta import Meta
 from emmental.model import EmmentalModel
@@ -49,6 +53,8 @@ def test_logging_manager_sample(caplog):
 
     assert logging_manager.sample_count == 5
     assert logging_manager.sample_total == 25
+    assert logging_manager.unit_count == 5
+    assert logging_manager.unit_total == 25
 
     assert logging_manager.batch_total == 4
     assert logging_manager.epoch_total == 0.4
@@ -89,8 +95,10 @@ def test_logging_manager_batch(caplog):
     assert logging_manager.trigger_checkpointing() is True
 
     assert logging_manager.batch_count == 0
+    assert logging_manager.unit_count == 0
 
     assert logging_manager.sample_total == 25
+    assert logging_manager.unit_total == 4
     assert logging_manager.batch_total == 4
     assert logging_manager.epoch_total == 0.8
 
@@ -137,6 +145,286 @@ def test_logging_manager_epoch(caplog):
     assert logging_manager.epoch_total == 2
 
 
+def test_logging_manager_epoch_end(caplog):
+    """Unit test of logging_manager (epoch end update)."""
+    caplog.set_level(logging.INFO)
+
+    emmental.init()
+    Meta.update_config(
+        config={
+            "meta_config": {"verbose": False},
+            "logging_config": {
+                "counter_unit": "epoch",
+                "evaluation_freq": 2,
+                "checkpointing": False,
+            },
+        }
+    )
+
+    logging_manager = LoggingManager(n_batches_per_epoch=4)
+
+    assert logging_manager.per_batch_hooks_needed is False
+
+    logging_manager.update_epoch_end(20)
+    assert logging_manager.trigger_evaluation() is False
+
+    logging_manager.update_epoch_end(20)
+    assert logging_manager.trigger_evaluation() is True
+
+    assert logging_manager.sample_total == 40
+    assert logging_manager.batch_total == 8
+    assert logging_manager.epoch_total == 2
+    assert logging_manager.epoch_count == 0
+
+    Meta.update_config(config={"logging_config": {"evaluation_freq": 0.5}})
+
+    assert LoggingManager(n_batches_per_epoch=4).per_batch_hooks_needed is True
+
+    Meta.update_config(
+        config={"logging_config": {"counter_unit": "batch", "evaluation_freq": 2}}
+    )
+
+    assert LoggingManager(n_batches_per_epoch=4).per_batch_hooks_needed is True
+
+
+def test_logging_manager_fractional_epoch(caplog):
+    """Unit test of logging_manager (fractional epoch)."""
+    caplog.set_level(logging.INFO)
+
+    emmental.init()
+    Meta.update_config(
+        config={
+            "meta_config": {"verbose": False},
+            "logging_config": {
+                "counter_unit": "epoch",
+                "evaluation_freq": 0.7,
+                "checkpointing": False,
+            },
+        }
+    )
+
+    logging_manager = LoggingManager(n_batches_per_epoch=10)
+
+    for _ in range(6):
+        logging_manager.update(5)
+        assert logging_manager.trigger_evaluation() is False
+
+    logging_manager.update(5)
+    assert logging_manager.trigger_evaluation() is True
+    assert logging_manager.batch_count == 0
+    assert logging_manager.batch_total == 7
+
+
+def test_logging_manager_resume(caplog):
+    """Unit test of logging_manager (resume from existing counters)."""
+    caplog.set_level(logging.INFO)
+
+    emmental.init()
+    Meta.update_config(
+        config={
+            "meta_config": {"verbose": False},
+            "logging_config": {
+                "counter_unit": "batch",
+                "evaluation_freq": 3,
+                "checkpointing": False,
+            },
+        }
+    )
+
+    with pytest.deprecated_call():
+        logging_manager = LoggingManager(4, 25, 100)
+
+    assert logging_manager.batch_count == 1
+    assert logging_manager.batch_total == 100
+    assert logging_manager.epoch_count == 0.25
+    assert logging_manager.epoch_total == 25
+
+    logging_manager.update(5)
+    assert logging_manager.trigger_evaluation() is False
+
+    logging_manager.update(5)
+    assert logging_manager.trigger_evaluation() is True
+
+    Meta.update_config(
+        config={
+            "logging_config": {
+                "counter_unit": "epoch",
+                "evaluation_freq": 2,
+            }
+        }
+    )
+
+    logging_manager = LoggingManager(n_batches_per_epoch=4, batch_count=20)
+
+    assert logging_manager.batch_count == 4
+    assert logging_manager.epoch_count == 1
+
+    for _ in range(3):
+        logging_manager.update(5)
+        assert logging_manager.trigger_evaluation() is False
+
+    logging_manager.update(5)
+    assert logging_manager.trigger_evaluation() is True
+
+    # Fractional frequencies resume on the cadence of the evaluation trigger
+    Meta.update_config(
+        config={
+            "logging_config": {
+                "counter_unit": "batch",
+                "evaluation_freq": 2.5,
+            }
+        }
+    )
+
+    logging_manager = LoggingManager(n_batches_per_epoch=4, batch_count=9)
+
+    assert logging_manager.batch_count == 0
+
+    for _ in range(2):
+        logging_manager.update(5)
+        assert logging_manager.trigger_evaluation() is False
+
+    logging_manager.update(5)
+    assert logging_manager.trigger_evaluation() is True
+
+    Meta.update_config(
+        config={
+            "logging_config": {
+                "counter_unit": "epoch",
+                "evaluation_freq": 1.3,
+            }
+        }
+    )
+
+    logging_manager = LoggingManager(n_batches_per_epoch=7, batch_count=30)
+
+    assert logging_manager.batch_count == 0
+
+    for _ in range(9):
+        logging_manager.update(5)
+        assert logging_manager.trigger_evaluation() is False
+
+    logging_manager.update(5)
+    assert logging_manager.trigger_evaluation() is True
+
+
+def test_logging_manager_checkpoint_model(caplog):
+    """Unit test of logging_manager (checkpoint model)."""
+    caplog.set_level(logging.INFO)
+
+    checkpoint_path = "temp_test_logging_manager"
+
+    emmental.init()
+    Meta.update_config(
+        config={
+            "meta_config": {"verbose": False},
+            "logging_config": {
+                "counter_unit": "batch",
+                "evaluation_freq": 1,
+                "checkpointing": True,
+                "checkpointer_config": {
+                    "checkpoint_path": checkpoint_path,
+                    "checkpoint_freq": 1,
+                    "checkpoint_metric": {"model/train/all/loss": "min"},
+                    "checkpoint_all": True,
+                },
+            },
+        }
+    )
+
+    model = EmmentalModel()
+    optimizer = torch.optim.SGD(torch.nn.Linear(2, 2).parameters(), lr=0.1)
+
+    logging_manager = LoggingManager(n_batches_per_epoch=2)
+
+    for loss in [0.5, 0.4]:
+        logging_manager.update(5)
+        assert logging_manager.trigger_evaluation() is True
+        assert logging_manager.trigger_checkpointing() is True
+        logging_manager.checkpoint_model(
+            model, optimizer, None, {"model/train/all/loss": loss}
+        )
+
+    logging_manager.wait_for_checkpoint()
+
+    for iteration in [1, 2]:
+        for state in ["model", "optimizer", "scheduler"]:
+            assert os.path.exists(
+                f"{checkpoint_path}/checkpoint_{iteration}.{state}.pth"
+            )
+
+    optimizer_dict = torch.load(f"{checkpoint_path}/checkpoint_2.optimizer.pth")
+    assert optimizer_dict["optimizer"]["param_groups"][0]["lr"] == 0.1
+    assert logging_manager.checkpointer.best_metric_dict == {
+        "model/train/all/loss": 0.4
+    }
+
+    # Postpone the checkpoint when the previous one was too recent
+    logging_manager.checkpoint_interval_factor = 1e6
+    logging_manager.update(5)
+    assert logging_manager.trigger_evaluation() is True
+    assert logging_manager.trigger_checkpointing() is False
+
+    # The postponed checkpoint is only retried at the next evaluation
+    logging_manager.checkpoint_max_interval = 0
+    assert logging_manager.trigger_checkpointing() is False
+
+    logging_manager.update(5)
+    assert logging_manager.trigger_evaluation() is True
+    assert logging_manager.trigger_checkpointing() is True
+
+    logging_manager.close(model)
+
+    shutil.rmtree(checkpoint_path)
+
+
+def test_logging_manager_checkpoint_error(caplog):
+    """Unit test of logging_manager (checkpoint error)."""
+    caplog.set_level(logging.INFO)
+
+    checkpoint_path = "temp_test_logging_manager"
+
+    emmental.init()
+    Meta.update_config(
+        config={
+            "meta_config": {"verbose": False},
+            "logging_config": {
+                "counter_unit": "batch",
+                "evaluation_freq": 1,
+                "checkpointing": True,
+                "checkpointer_config": {
+                    "checkpoint_path": checkpoint_path,
+                    "checkpoint_freq": 1,
+                },
+            },
+        }
+    )
+
+    model = EmmentalModel()
+    optimizer = torch.optim.SGD(torch.nn.Linear(2, 2).parameters(), lr=0.1)
+
+    logging_manager = LoggingManager(n_batches_per_epoch=2)
+
+    def save(iteration, state, metric_dict):
+        raise IOError("Disk full")
+
+    logging_manager.checkpointer.save = save
+
+    logging_manager.update(5)
+    assert logging_manager.trigger_evaluation() is True
+    assert logging_manager.trigger_checkpointing() is True
+    logging_manager.checkpoint_model(model, optimizer, None, {})
+
+    # The saving error is re-raised and the checkpoint executor is still shut down
+    with pytest.raises(IOError):
+        logging_manager.close(model)
+
+    with pytest.raises(RuntimeError):
+        logging_manager._checkpoint_executor.submit(print)
+
+    shutil.rmtree(checkpoint_path)
+
+
 def test_logging_manager_no_checkpointing(caplog):
     """Unit test of logging_manager (no checkpointing)."""
     caplog.set_level(logging.INFO)
@@ -208,6 +496,223 @@ def test_logging_manager_json(caplog):
     assert type(logging_manager.writer) == LogWriter
 
 
+def test_logging_manager_epoch_log_step(caplog):
+    """Unit test of logging_manager (epoch log step)."""
+    caplog.set_level(logging.INFO)
+
+    Meta.reset()
+
+    emmental.init()
+    Meta.update_config(
+        config={
+            "logging_config": {
+                "counter_unit": "epoch",
+                "evaluation_freq": 1,
+                "checkpointing": False,
+                "writer_config": {"writer": "json"},
+            }
+        }
+    )
+
+    logging_manager = LoggingManager(n_batches_per_epoch=7)
+
+    # Epochs are logged at the exact number of batches
+    for _ in range(29):
+        logging_manager.update(5)
+    logging_manager.write_log({"loss": 0.5})
+
+    assert logging_manager.writer.run_log["loss"] == [(29, 0.5)]
+
+    logging_manager.close(EmmentalModel())
+
+
+def test_logging_manager_flush_logs(caplog):
+    """Unit test of logging_manager (flush logs)."""
+    caplog.set_level(logging.INFO)
+
+    Meta.reset()
+
+    emmental.init()
+    Meta.update_config(
+        config={
+            "logging_config": {
+                "counter_unit": "batch",
+                "evaluation_freq": 1,
+                "checkpointing": False,
+                "writer_config": {"writer": "json", "flush_every": 3},
+            }
+        }
+    )
+
+    logging_manager = LoggingManager(n_batches_per_epoch=2)
+
+    # Count the writer flushes, which only happen at checkpointing and closing
+    flushes = []
+    logging_manager.writer.flush = lambda: flushes.append(1)
+
+    logging_manager.update(5)
+    logging_manager.write_log({"loss": 0.5, "lr": 0.1})
+
+    assert len(logging_manager.writer.run_log) == 0
+
+    logging_manager.update(5)
+    logging_manager.write_log({"loss": 0.4, "lr": 0.1})
+
+    assert logging_manager.writer.run_log["loss"] == [(1, 0.5), (2, 0.4)]
+    assert logging_manager.writer.run_log["lr"] == [(1, 0.1), (2, 0.1)]
+
+    logging_manager.update(5)
+    logging_manager.write_log({"loss": 0.3})
+
+    assert logging_manager.writer.run_log["loss"] == [(1, 0.5), (2, 0.4)]
+    assert len(flushes) == 0
+
+    logging_manager.close(EmmentalModel())
+
+    assert logging_manager.writer.run_log["loss"] == [(1, 0.5), (2, 0.4), (3, 0.3)]
+    assert len(flushes) == 1
+
+
+def test_logging_manager_shared_writer(caplog):
+    """Unit test of logging_manager (shared writer)."""
+    caplog.set_level(logging.INFO)
+
+    Meta.reset()
+
+    emmental.init()
+    Meta.update_config(
+        config={
+            "logging_config": {
+                "counter_unit": "batch",
+                "evaluation_freq": 1,
+                "checkpointing": False,
+                "writer_config": {"writer": "json", "flush_every": 1},
+            }
+        }
+    )
+
+    logging_manager_1 = LoggingManager(n_batches_per_epoch=2)
+    logging_manager_2 = LoggingManager(n_batches_per_epoch=2)
+
+    assert logging_manager_1.writer is logging_manager_2.writer
+
+    logging_manager_2.update(5)
+    logging_manager_2.write_log({"task_2/loss": 0.5})
+    logging_manager_2.close(EmmentalModel())
+
+    logging_manager_3 = LoggingManager(n_batches_per_epoch=2)
+
+    assert logging_manager_3.writer is logging_manager_1.writer
+    assert logging_manager_1.writer.run_log["task_2/loss"] == [(1, 0.5)]
+
+    # The writer stays shared until the last logging manager using it is closed
+    logging_manager_1.close(EmmentalModel())
+
+    logging_manager_4 = LoggingManager(n_batches_per_epoch=2)
+
+    assert logging_manager_4.writer is logging_manager_3.writer
+
+    logging_manager_3.update(5)
+    logging_manager_3.write_log({"task_3/loss": 0.4})
+    logging_manager_3.close(EmmentalModel())
+    logging_manager_4.close(EmmentalModel())
+
+    assert logging_manager_1.writer.run_log["task_3/loss"] == [(1, 0.4)]
+
+    logging_manager_5 = LoggingManager(n_batches_per_epoch=2)
+
+    assert logging_manager_5.writer is not logging_manager_1.writer
+
+    # The buffered metrics of the open logging managers are written at exit
+    logging_manager_5.flush_every = 10
+    logging_manager_5.update(5)
+    logging_manager_5.write_log({"task_5/loss": 0.3})
+
+    assert len(logging_manager_5.writer.run_log) == 0
+
+    _close_shared_writers()
+
+    assert logging_manager_5.writer.run_log["task_5/loss"] == [(1, 0.3)]
+
+    logging_manager_5.close(EmmentalModel())
+
+    # The writer is released when a logging manager is collected without closing
+    logging_manager_6 = LoggingManager(n_batches_per_epoch=2)
+    writer = logging_manager_6.writer
+
+    del logging_manager_6
+    gc.collect()
+
+    logging_manager_7 = LoggingManager(n_batches_per_epoch=2)
+
+    assert logging_manager_7.writer is not writer
+
+    logging_manager_7.close(EmmentalModel())
+
+
+def test_logging_manager_log_period(caplog):
+    """Unit test of logging_manager (log period)."""
+    caplog.set_level(logging.INFO)
+
+    Meta.reset()
+
+    emmental.init()
+    Meta.update_config(
+        config={
+            "logging_config": {
+                "counter_unit": "batch",
+                "evaluation_freq": 1,
+                "checkpointing": False,
+                "writer_config": {"writer": "json", "flush_every": 1, "log_period": 2},
+            }
+        }
+    )
+
+    logging_manager = LoggingManager(n_batches_per_epoch=2)
+
+    logging_manager.update(5)
+    logging_manager.write_log({"loss": 0.5})
+    logging_manager.write_log({"loss": 0.5, "lr": 0.1})
+
+    assert logging_manager.writer.run_log["loss"] == [(1, 0.5)]
+    assert logging_manager.writer.run_log["lr"] == [(1, 0.1)]
+
+    for loss in [0.5, 0.25, 0.1]:
+        logging_manager.update(5)
+        logging_manager.write_log({"loss": loss})
+
+    assert logging_manager.writer.run_log["loss"] == [(1, 0.5), (3, 0.375)]
+
+    logging_manager.close(EmmentalModel())
+
+    assert logging_manager.writer.run_log["loss"] == [(1, 0.5), (3, 0.375), (4, 0.1)]
+
+    # The log period is measured in the counter unit
+    for counter_unit, log_period in [("sample", 10), ("epoch", 1)]:
+        Meta.update_config(
+            config={
+                "logging_config": {
+                    "counter_unit": counter_unit,
+                    "writer_config": {"log_period": log_period},
+                }
+            }
+        )
+
+        logging_manager = LoggingManager(n_batches_per_epoch=2)
+
+        for loss in [0.5, 0.25, 0.75]:
+            logging_manager.update(5)
+            logging_manager.write_log({"loss": loss})
+
+        step_size = 5 if counter_unit == "sample" else 1
+        assert logging_manager.writer.run_log["loss"] == [
+            (step_size, 0.5),
+            (3 * step_size, 0.5),
+        ]
+
+        logging_manager.close(EmmentalModel())
+
+
 def test_logging_manager_tensorboard(caplog):
     """Unit test of logging_manager (tensorboard)."""
     caplog.set_level(logging.INFO)
@@ -255,6 +760,9 @@ def test_logging_manager_no_writer(caplog):
 
     assert logging_manager.writer is None
 
+    logging_manager.write_log({"loss": 0.5})
+    logging_manager.close(EmmentalModel())
+
 
 def test_logging_manager_wrong_writer(caplog):
     """Unit test of logging_manager (wrong writer)."""
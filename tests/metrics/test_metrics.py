@@ -279,3 +279,9 @@ def test_accuracy_f1(caplog):
     metric_dict = accuracy_f1_scorer(PROB_GOLDS, None, PREDS)
 
     assert isequal(metric_dict, {"accuracy_f1": 0.5833333333333333})
+
+    metric_dict = accuracy_f1_scorer(
+        np.array([0, 1, 2, 2]), None, np.array([0, 2, 2, 1]), pos_label=2
+    )
+
+    assert isequal(metric_dict, {"accuracy_f1": 0.5})
@@ -158,7 +158,12 @@ def test_parse_args(caplog):
         "logging_config": {
             "counter_unit": "epoch",
             "evaluation_freq": 1,
-            "writer_config": {"writer": "tensorboard", "verbose": True},
+            "writer_config": {
+                "writer": "tensorboard",
+                "verbose": True,
+                "flush_every": 1,
+                "log_period": 0,
+            },
             "checkpointing": False,
             "checkpointer_config": {
                 "checkpoint_path": None,
@@ -167,6 +172,10 @@ def test_parse_args(caplog):
                 "checkpoint_task_metrics": None,
                 "checkpoint_runway": 0,
                 "checkpoint_all": True,
+                "checkpoint_incremental": False,
+                "checkpoint_incremental_base_freq": 10,
+                "checkpoint_interval_factor": 0,
+                "checkpoint_max_interval": 3600,
                 "clear_intermediate_checkpoints": True,
                 "clear_all_checkpoints": False,
             },
@@ -338,7 +347,12 @@ def test_checkpoint_metric(caplog):
         "logging_config": {
             "counter_unit": "epoch",
             "evaluation_freq": 1,
-            "writer_config": {"writer": "tensorboard", "verbose": True},
+            "writer_config": {
+                "writer": "tensorboard",
+                "verbose": True,
+                "flush_every": 1,
+                "log_period": 0,
+            },
             "checkpointing": False,
             "checkpointer_config": {
                 "checkpoint_path": None,
@@ -347,6 +361,10 @@ def test_checkpoint_metric(caplog):
                 "checkpoint_task_metrics": None,
                 "checkpoint_runway": 0,
                 "checkpoint_all": False,
+                "checkpoint_incremental": False,
+                "checkpoint_incremental_base_freq": 10,
+                "checkpoint_interval_factor": 0,
+                "checkpoint_max_interval": 3600,
                 "clear_intermediate_checkpoints": True,
                 "clear_all_checkpoints": False,
             },